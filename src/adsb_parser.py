@@ -4,11 +4,52 @@ Parses BaseStation (SBS-1) format ADS-B messages
 """
 
 import logging
-from typing import Optional, Dict, Any
+from typing import List, Optional, NamedTuple, Tuple, Union
 from datetime import datetime
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# Lines are parsed as raw bytes; only text columns are decoded to str
+
+# Message types accepted by parse_line (keys of ADSBParser.MESSAGE_TYPES)
+_MSG_TYPES = frozenset({b'SEL', b'ID', b'AIR', b'STA', b'CLK', b'MSG'})
+
+# Flag field values; anything else (including empty) maps to None
+_BOOL_VALUES = {
+    b'0': False, b'false': False, b'False': False, b'FALSE': False,
+    b'1': True, b'-1': True, b'true': True, b'True': True, b'TRUE': True,
+}
+
+
+class ADSBMessage(NamedTuple):
+    """
+    Parsed BaseStation message
+
+    The first fifteen fields follow the column order of the messages
+    INSERT, and the first eight that of the positions INSERT, so rows
+    are bound as plain tuple slices without repacking.
+    """
+    icao24: str
+    timestamp: datetime
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    altitude: Optional[int] = None
+    ground_speed: Optional[float] = None
+    track: Optional[float] = None
+    vertical_rate: Optional[int] = None
+    message_type: Optional[str] = None
+    callsign: Optional[str] = None
+    squawk: Optional[str] = None
+    alert: Optional[bool] = None
+    emergency: Optional[bool] = None
+    spi: Optional[bool] = None
+    is_on_ground: Optional[bool] = None
+    transmission_type: Optional[int] = None
+    # True when the line's own timestamp was missing or malformed and the
+    # batch receive time was used instead; such records are not deduplicated
+    timestamp_estimated: bool = False
+
 
 class ADSBParser:
     """Parser for BaseStation format ADS-B messages"""
@@ -35,118 +76,201 @@ class ADSBParser:
         8: 'ALL_CALL_REPLY'
     }
     
-    def parse(self, line: str) -> Optional[Dict[str, Any]]:
+    def parse(self, line: Union[bytes, str]) -> Optional[ADSBMessage]:
         """
         Parse a BaseStation format message
+
+        Thin wrapper around the module-level parse_line() fast path.
+
+        Args:
+            line: Raw message line (bytes as read from Dump1090; str is
+                  encoded first)
+
+        Returns:
+            ADSBMessage record or None if parsing fails
+        """
+        if isinstance(line, str):
+            line = line.encode('utf-8')
+        return parse_line(line)
+    
+    def parse_batch(self, lines: List[bytes]) -> List[ADSBMessage]:
+        """
+        Parse a batch of BaseStation lines
         
-        Format: MSG,transmission_type,session_id,aircraft_id,icao24,flight_id,
-                date_generated,time_generated,date_logged,time_logged,
-                callsign,altitude,ground_speed,track,lat,lon,vertical_rate,
-                squawk,alert,emergency,spi,is_on_ground
+        The clock is read once per batch, as the timestamp for any line
+        whose own is missing or malformed.
         
         Args:
-            line: Raw message line
+            lines: Raw message lines as bytes
             
         Returns:
-            Dictionary with parsed fields or None if parsing fails
+            ADSBMessage records for the lines that parsed
         """
-        try:
-            fields = line.split(',')
-            
-            if len(fields) < 10:
-                logger.debug(f"Message too short: {len(fields)} fields")
-                return None
-            
-            message_type = fields[0]
-            
-            if message_type not in self.MESSAGE_TYPES:
-                logger.debug(f"Unknown message type: {message_type}")
-                return None
-            
-            # Parse common fields
-            parsed = {
-                'message_type': message_type,
-                'transmission_type': self._parse_int(fields[1]) if len(fields) > 1 else None,
-                'session_id': self._parse_int(fields[2]) if len(fields) > 2 else None,
-                'aircraft_id': self._parse_int(fields[3]) if len(fields) > 3 else None,
-                'icao24': fields[4].strip() if len(fields) > 4 else None,
-                'flight_id': self._parse_int(fields[5]) if len(fields) > 5 else None,
-            }
-            
-            # Parse timestamp
-            if len(fields) > 8:
-                parsed['timestamp'] = self._parse_timestamp(
-                    fields[6], fields[7]  # date_generated, time_generated
-                )
-            
-            # Parse message-specific fields (MSG type)
-            if message_type == 'MSG' and len(fields) >= 22:
-                parsed.update({
-                    'callsign': fields[10].strip() if fields[10] else None,
-                    'altitude': self._parse_int(fields[11]),
-                    'ground_speed': self._parse_float(fields[12]),
-                    'track': self._parse_float(fields[13]),
-                    'lat': self._parse_float(fields[14]),
-                    'lon': self._parse_float(fields[15]),
-                    'vertical_rate': self._parse_int(fields[16]),
-                    'squawk': fields[17].strip() if fields[17] else None,
-                    'alert': self._parse_bool(fields[18]),
-                    'emergency': self._parse_bool(fields[19]),
-                    'spi': self._parse_bool(fields[20]),
-                    'is_on_ground': self._parse_bool(fields[21])
-                })
-            
-            # Validate required fields
-            if not parsed.get('icao24') or not parsed.get('timestamp'):
-                return None
-            
-            return parsed
-            
-        except Exception as e:
-            logger.debug(f"Failed to parse message: {e} - Line: {line[:100]}")
-            return None
-    
-    def _parse_int(self, value: str) -> Optional[int]:
-        """Safely parse integer"""
-        try:
-            return int(value) if value and value.strip() else None
-        except ValueError:
+        now = datetime.utcnow()
+        return [message for message in (parse_line(line, now) for line in lines)
+                if message is not None]
+
+
+def parse_line(line: bytes, now: Optional[datetime] = None) -> Optional[ADSBMessage]:
+    """
+    Parse a BaseStation format message
+
+    Format: MSG,transmission_type,session_id,aircraft_id,icao24,flight_id,
+            date_generated,time_generated,date_logged,time_logged,
+            callsign,altitude,ground_speed,track,lat,lon,vertical_rate,
+            squawk,alert,emergency,spi,is_on_ground
+
+    Kept at module level so the per-message path resolves its helpers
+    as plain globals instead of bound-method lookups on the parser.
+
+    Args:
+        line: Raw message line as bytes
+        now: Timestamp for a line whose own is missing or malformed
+             (defaults to the current UTC time)
+
+    Returns:
+        ADSBMessage record or None if parsing fails
+    """
+    try:
+        # Nearly all traffic is full 22-field MSG lines; take the
+        # specialized path for those and leave the rest to _parse_other()
+        if line.startswith(b'MSG,'):
+            fields = line.split(b',')
+            if len(fields) >= 22:
+                return _parse_msg(fields, now)
+        return _parse_other(line, now)
+
+    except Exception as e:
+        logger.debug("Failed to parse message: %s - Line: %r", e, line[:100])
+        return None
+
+
+def _parse_msg(fields: List[bytes], now: Optional[datetime]) -> Optional[ADSBMessage]:
+    """Parse the fields of a MSG line known to have at least 22 fields"""
+    icao24 = fields[4].strip()
+    timestamp = _parse_timestamp(fields[6], fields[7])  # date_generated, time_generated
+
+    # Validate required fields
+    if not icao24:
+        return None
+    estimated = timestamp is None
+    if estimated:
+        timestamp = now or datetime.utcnow()
+
+    # Local aliases: one global lookup each instead of one per field
+    pi, pf, pb = _parse_int, _parse_float, _parse_bool
+    return ADSBMessage(
+        icao24.decode('utf-8', 'ignore'),
+        timestamp,
+        pf(fields[14]),                              # lat
+        pf(fields[15]),                              # lon
+        pi(fields[11]),                              # altitude
+        pf(fields[12]),                              # ground_speed
+        pf(fields[13]),                              # track
+        pi(fields[16]),                              # vertical_rate
+        'MSG',
+        _parse_text(fields[10]),                     # callsign
+        _parse_text(fields[17]),                     # squawk
+        pb(fields[18]),                              # alert
+        pb(fields[19]),                              # emergency
+        pb(fields[20]),                              # spi
+        pb(fields[21]),                              # is_on_ground
+        pi(fields[1]),                               # transmission_type
+        estimated
+    )
+
+
+def _parse_other(line: bytes, now: Optional[datetime]) -> Optional[ADSBMessage]:
+    """Parse SEL/ID/AIR/STA/CLK lines and short MSG lines (common fields only)"""
+    fields = line.split(b',')
+    field_count = len(fields)
+
+    if field_count < 10:
+        logger.debug("Message too short: %d fields", field_count)
+        return None
+
+    message_type = fields[0]
+
+    if message_type not in _MSG_TYPES:
+        logger.debug("Unknown message type: %r", message_type)
+        return None
+
+    icao24 = fields[4].strip()
+    timestamp = _parse_timestamp(fields[6], fields[7])  # date_generated, time_generated
+
+    # Validate required fields
+    if not icao24:
+        return None
+    estimated = timestamp is None
+    if estimated:
+        timestamp = now or datetime.utcnow()
+
+    return ADSBMessage(icao24.decode('utf-8', 'ignore'), timestamp,
+                       message_type=message_type.decode('ascii'),
+                       transmission_type=_parse_int(fields[1]),
+                       timestamp_estimated=estimated)
+
+
+def _parse_int(value: bytes) -> Optional[int]:
+    """Safely parse integer"""
+    # BaseStation fields are never padded, so an (ASCII-only) digit check
+    # replaces the strip() and keeps the exception machinery off the
+    # common path
+    if value.isdigit() or (value[:1] == b'-' and value[1:].isdigit()):
+        return int(value)
+    return None
+
+
+def _parse_float(value: bytes) -> Optional[float]:
+    """Safely parse float"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _parse_bool(value: bytes) -> Optional[bool]:
+    """Safely parse boolean"""
+    return _BOOL_VALUES.get(value)
+
+
+def _parse_text(value: bytes) -> Optional[str]:
+    """Decode a text field (callsign, squawk); empty maps to None"""
+    return value.strip().decode('utf-8', 'ignore') if value else None
+
+
+@lru_cache(maxsize=8)
+def _parse_date(date_str: bytes) -> Tuple[int, int, int]:
+    """Split a YYYY/MM/DD date into (year, month, day)"""
+    return int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10])
+
+
+def _parse_timestamp(date_str: bytes, time_str: bytes) -> Optional[datetime]:
+    """Parse date and time strings into datetime object; None if missing or malformed"""
+    try:
+        if not date_str or not time_str:
             return None
-    
-    def _parse_float(self, value: str) -> Optional[float]:
-        """Safely parse float"""
+
+        # Fast path for the fixed BaseStation layout YYYY/MM/DD and HH:MM:SS[.mmm].
+        # The date is the same for every message in a day, so it is cached.
+        time_len = len(time_str)
+        if len(date_str) == 10 and (time_len == 12 or time_len == 8):
+            year, month, day = _parse_date(date_str)
+            return datetime(
+                year, month, day,
+                int(time_str[0:2]), int(time_str[3:5]), int(time_str[6:8]),
+                int(time_str[9:12]) * 1000 if time_len == 12 else 0
+            )
+
+        # Format: YYYY/MM/DD and HH:MM:SS.mmm
+        datetime_str = (date_str + b' ' + time_str).decode('ascii', 'ignore')
+        return datetime.strptime(datetime_str, "%Y/%m/%d %H:%M:%S.%f")
+    except ValueError:
         try:
-            return float(value) if value and value.strip() else None
+            # Try without milliseconds
+            datetime_str = (date_str + b' ' + time_str).decode('ascii', 'ignore')
+            return datetime.strptime(datetime_str, "%Y/%m/%d %H:%M:%S")
         except ValueError:
             return None
-    
-    def _parse_bool(self, value: str) -> Optional[bool]:
-        """Safely parse boolean"""
-        if not value or not value.strip():
-            return None
-        value = value.strip()
-        if value == '0' or value.lower() == 'false':
-            return False
-        if value == '1' or value.lower() == 'true':
-            return True
-        if value == '-1':
-            return True
-        return None
-    
-    def _parse_timestamp(self, date_str: str, time_str: str) -> Optional[datetime]:
-        """Parse date and time strings into datetime object"""
-        try:
-            if not date_str or not time_str:
-                return datetime.utcnow()
-            
-            # Format: YYYY/MM/DD and HH:MM:SS.mmm
-            datetime_str = f"{date_str} {time_str}"
-            return datetime.strptime(datetime_str, "%Y/%m/%d %H:%M:%S.%f")
-        except ValueError:
-            try:
-                # Try without milliseconds
-                datetime_str = f"{date_str} {time_str}"
-                return datetime.strptime(datetime_str, "%Y/%m/%d %H:%M:%S")
-            except ValueError:
-                return datetime.utcnow()
-                
\ No newline at end of file
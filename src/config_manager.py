@@ -20,7 +20,8 @@ class ConfigManager:
             'host': 'localhost',
             'port': 30003,
             'reconnect_interval': 5,
-            'max_reconnect_interval': 60
+            'max_reconnect_interval': 60,
+            'rcvbuf': 0
         },
         'database': {
             'host': 'localhost',
@@ -35,7 +36,10 @@ class ConfigManager:
             'batch_size': 100,
             'batch_timeout': 1.0,
             'enable_deduplication': True,
-            'dedup_window': 2
+            'dedup_window': 2,
+            'max_queue_size': 100000,
+            'target_commit_latency': None,
+            'cpu_affinity': None
         },
         'logging': {
             'level': 'INFO',
@@ -4,13 +4,25 @@ Coordinates data flow, batching, and deduplication
 """
 
 import logging
+import queue
 import time
 import threading
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from collections import deque
 
 logger = logging.getLogger(__name__)
 
+# Number of recent message keys remembered for deduplication
+DEDUP_CACHE_SIZE = 1000
+
+# Adaptive batch sizing (enabled by target_commit_latency): bounds for
+# batch_size, EWMA weight of each commit latency sample, and the number
+# of samples taken after a resize before the next one is considered
+MIN_BATCH_SIZE = 8
+MAX_BATCH_SIZE = 512
+LATENCY_EWMA_ALPHA = 0.3
+ADAPT_SAMPLES = 4
+
 
 class DataProcessor:
     """Processes and batches ADS-B messages for database insertion"""
@@ -29,11 +41,32 @@ class DataProcessor:
         self.enable_deduplication = config.get('enable_deduplication', True)
         self.dedup_window = config.get('dedup_window', 2)
         
-        self.message_queue = deque()
+        # Backlog cap: messages beyond it are dropped on arrival so a slow or
+        # unreachable database cannot grow the queue without bound
+        self.max_queue_size = config.get('max_queue_size', 100000)
+        self._overflowing = False
+        
+        # Commit latency target in seconds; None keeps batch_size fixed
+        self.target_commit_latency = config.get('target_commit_latency')
+        self._commit_latency = None  # EWMA since the last resize
+        self._latency_samples = 0
+        
+        # Reader thread -> writer thread handoff of message lists (one per
+        # socket read). SimpleQueue.put() never blocks, so the socket reader
+        # is never held up by database I/O.
+        self.message_queue = queue.SimpleQueue()
+        self._enqueued = 0  # messages put on the queue (reader thread)
+        self._dequeued = 0  # messages taken off the queue (writer thread)
+        
+        # Writer-side batch, reused across flushes (inserts are synchronous,
+        # so it is cleared rather than replaced); the lock only serializes
+        # periodic_flush() against force_flush() and is never taken by the
+        # reader
+        self.pending: List = []
         self.lock = threading.Lock()
         self.last_flush = time.time()
         
-        # Statistics
+        # Statistics (each counter has a single writing thread)
         self.stats = {
             'messages_received': 0,
             'messages_processed': 0,
@@ -42,88 +75,243 @@ class DataProcessor:
             'errors': 0
         }
         
-        # Deduplication cache (simple time-based)
-        self.recent_messages = deque(maxlen=1000)
+        # Deduplication cache: set for O(1) membership, deque for
+        # oldest-first eviction once DEDUP_CACHE_SIZE keys are held
+        self.recent_keys = set()
+        self.recent_messages = deque()
         
-    def add_message(self, message: Dict[str, Any]):
+    def add_message(self, message):
         """
         Add message to processing queue
         
         Args:
-            message: Parsed message dictionary
+            message: Parsed ADSBMessage record
         """
-        with self.lock:
-            self.stats['messages_received'] += 1
-            
-            # Deduplicate if enabled
-            if self.enable_deduplication:
-                if self._is_duplicate(message):
-                    self.stats['messages_discarded'] += 1
-                    return
-            
-            self.message_queue.append(message)
-            self.recent_messages.append(self._message_key(message))
-            
-            # Check if we should flush
-            if len(self.message_queue) >= self.batch_size:
-                self._flush_batch()
-            elif time.time() - self.last_flush >= self.batch_timeout:
-                self._flush_batch()
+        self.add_messages([message])
     
-    def _is_duplicate(self, message: Dict[str, Any]) -> bool:
-        """Check if message is a recent duplicate"""
-        key = self._message_key(message)
-        return key in self.recent_messages
+    def add_messages(self, messages: List):
+        """
+        Add a batch of messages to the processing queue
+        
+        Called from the reader thread only; the batch goes onto the queue
+        with a single put(), and database writes happen on the
+        periodic_flush() writer thread. Messages that would take the
+        backlog past max_queue_size are dropped and counted as discarded.
+        
+        Args:
+            messages: Parsed ADSBMessage records
+        """
+        received = len(messages)
+        self.stats['messages_received'] += received
+        
+        # Deduplicate if enabled
+        if self.enable_deduplication:
+            recent_keys = self.recent_keys
+            remember = self._remember
+            unique = []
+            for message in messages:
+                # A fallback timestamp is shared by every such line in a
+                # read, so it says nothing about duplication
+                if message.timestamp_estimated:
+                    unique.append(message)
+                    continue
+                # Dedup key: (icao24, timestamp, transmission_type)
+                key = (message.icao24, message.timestamp, message.transmission_type)
+                if key not in recent_keys:
+                    remember(key)
+                    unique.append(message)
+            self.stats['messages_discarded'] += received - len(unique)
+            messages = unique
+        
+        if not messages:
+            return
+        
+        room = self.max_queue_size - self._backlog()
+        if room < len(messages):
+            if not self._overflowing:
+                logger.warning("Queue full (%d messages), dropping new messages",
+                               self.max_queue_size)
+                self._overflowing = True
+            room = max(room, 0)
+            self.stats['messages_discarded'] += len(messages) - room
+            messages = messages[:room]
+            if not messages:
+                return
+        elif self._overflowing:
+            logger.info("Queue below limit again, accepting messages")
+            self._overflowing = False
+        
+        self._enqueued += len(messages)
+        self.message_queue.put(messages)
     
-    def _message_key(self, message: Dict[str, Any]) -> str:
-        """Generate unique key for message deduplication"""
-        icao = message.get('icao24', '')
-        timestamp = message.get('timestamp', '')
-        msg_type = message.get('transmission_type', '')
-        return f"{icao}:{timestamp}:{msg_type}"
+    def _remember(self, key: Tuple):
+        """Record a message key, evicting the oldest beyond DEDUP_CACHE_SIZE"""
+        self.recent_keys.add(key)
+        self.recent_messages.append(key)
+        if len(self.recent_messages) > DEDUP_CACHE_SIZE:
+            self.recent_keys.discard(self.recent_messages.popleft())
+    
+    def _drain_queue(self):
+        """Move queued message lists into the pending batch until it holds batch_size"""
+        pending = self.pending
+        get = self.message_queue.get_nowait
+        while len(pending) < self.batch_size:
+            try:
+                messages = get()
+            except queue.Empty:
+                break
+            self._dequeued += len(messages)
+            pending.extend(messages)
     
     def _flush_batch(self):
-        """Flush current batch to database"""
-        if not self.message_queue:
+        """Flush all pending messages to database, batch_size at a time"""
+        pending = self.pending
+        if not pending:
             return
         
-        messages = list(self.message_queue)
-        self.message_queue.clear()
+        # Hand the pending list over as-is; only a batch that overran
+        # batch_size (one queued list can) is cut into slices
+        size = self.batch_size
+        if len(pending) <= size:
+            self._write_batch(pending)
+        else:
+            for start in range(0, len(pending), size):
+                self._write_batch(pending[start:start + size])
+        pending.clear()
+    
+    def _flush_full_batches(self):
+        """Flush whole batches of batch_size, leaving the remainder pending"""
+        pending = self.pending
+        size = self.batch_size
+        full = len(pending) - len(pending) % size
+        if full == len(pending):
+            self._flush_batch()
+            return
         
+        # Slice each batch off the front once and trim the list in a single
+        # del, instead of re-slicing the remainder after every batch
+        for start in range(0, full, size):
+            self._write_batch(pending[start:start + size])
+        del pending[:full]
+    
+    def _write_batch(self, messages: List):
+        """Insert one batch of messages into the database"""
         try:
+            started = time.monotonic()
             inserted = self.db.batch_insert_messages(messages)
+            if self.target_commit_latency:
+                self._adapt_batch_size(time.monotonic() - started)
             self.stats['messages_processed'] += inserted
             self.stats['batches_written'] += 1
             self.last_flush = time.time()
             
             if inserted > 0:
-                logger.debug(f"Flushed batch of {inserted} messages")
+                logger.debug("Flushed batch of %d messages", inserted)
                 
         except Exception as e:
-            logger.error(f"Failed to flush batch: {e}")
+            logger.error("Failed to flush batch: %s", e)
             self.stats['errors'] += 1
-            # Re-queue messages for retry (optional)
-            # self.message_queue.extendleft(reversed(messages))
+    
+    def _adapt_batch_size(self, latency: float):
+        """
+        Resize batch_size from the observed commit latency
+        
+        Halves the batch size while the latency EWMA is above
+        target_commit_latency, and doubles it while the latency is within
+        target but the backlog exceeds two batches. It never shrinks while
+        backlogged: a target below the database's fixed per-commit cost
+        would otherwise drive it to MIN_BATCH_SIZE and cut throughput just
+        when the writer is behind.
+        """
+        if self._commit_latency is None:
+            self._commit_latency = latency
+        else:
+            self._commit_latency += LATENCY_EWMA_ALPHA * (latency - self._commit_latency)
+        self._latency_samples += 1
+        if self._latency_samples < ADAPT_SAMPLES:
+            return
+        
+        batch_size = self.batch_size
+        over_target = self._commit_latency > self.target_commit_latency
+        if self._backlog() > 2 * batch_size:
+            if not over_target:
+                batch_size = min(batch_size * 2, MAX_BATCH_SIZE)
+        elif over_target:
+            batch_size = max(batch_size // 2, MIN_BATCH_SIZE)
+        
+        if batch_size != self.batch_size:
+            logger.debug("Batch size %d -> %d (commit latency %.1f ms)",
+                         self.batch_size, batch_size, self._commit_latency * 1000)
+            self.batch_size = batch_size
+            # Start a fresh estimate for the new size
+            self._commit_latency = None
+            self._latency_samples = 0
+    
+    def _backlog(self) -> int:
+        """Messages queued or pending but not yet written"""
+        return self._enqueued - self._dequeued + len(self.pending)
     
     def force_flush(self):
         """Force flush any pending messages"""
         with self.lock:
-            self._flush_batch()
+            while True:
+                self._drain_queue()
+                if not self.pending:
+                    break
+                self._flush_batch()
+    
+    def wake(self):
+        """Wake the writer thread so it re-checks its stop flag now"""
+        self.message_queue.put([])
     
     def get_stats(self) -> Dict[str, Any]:
         """Get processing statistics"""
-        with self.lock:
-            stats = self.stats.copy()
-            stats['queue_size'] = len(self.message_queue)
-            return stats
+        stats = self.stats.copy()
+        stats['queue_size'] = self._backlog()
+        stats['batch_size'] = self.batch_size
+        return stats
+    
+    def periodic_flush(self, stop_flag):
+        """
+        Writer thread: drain queued messages and flush them in batches
+        
+        Flushes when batch_size messages are pending or batch_timeout
+        seconds have passed since the last flush.
+        
+        Args:
+            stop_flag: Function that returns True once the service should stop
+        """
+        while not stop_flag():
+            self.periodic_flush_once()
     
-    def periodic_flush(self, running_flag):
-        """Periodic flush thread"""
-        while running_flag():
-            time.sleep(0.1)  # Check every 100ms
+    def periodic_flush_once(self, max_wait: Optional[float] = None):
+        """
+        One writer iteration: wait for queued messages, then flush as due
+        
+        Args:
+            max_wait: Upper bound in seconds on the wait for new messages,
+                      for callers that also run other timers on this thread
+        """
+        # Wake up in time for the timeout flush of a partial batch
+        timeout = self.batch_timeout
+        if self.pending:
+            timeout = max(self.last_flush + self.batch_timeout - time.time(), 0.01)
+        if max_wait is not None:
+            timeout = max(min(timeout, max_wait), 0.01)
+        
+        try:
+            messages = self.message_queue.get(timeout=timeout)
+        except queue.Empty:
+            messages = None
+        
+        with self.lock:
+            if messages is not None:
+                self._dequeued += len(messages)
+                self.pending.extend(messages)
+                self._drain_queue()
+            
+            if len(self.pending) >= self.batch_size:
+                self._flush_full_batches()
             
-            with self.lock:
-                if time.time() - self.last_flush >= self.batch_timeout:
-                    if self.message_queue:
-                        self._flush_batch()
-                        
\ No newline at end of file
+            if time.time() - self.last_flush >= self.batch_timeout:
+                self._flush_batch()
\ No newline at end of file
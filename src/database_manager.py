@@ -5,13 +5,45 @@ Handles MySQL connection pooling, queries, and batch inserts
 
 import logging
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from contextlib import contextmanager
+from itertools import chain
+from operator import itemgetter
 import mysql.connector
 from mysql.connector import pooling, Error as MySQLError
 
 logger = logging.getLogger(__name__)
 
+# Number of leading ADSBMessage fields that map onto each INSERT
+MESSAGE_COLUMN_COUNT = 15
+POSITION_COLUMN_COUNT = 8
+
+# C-level row extractor for the messages INSERT
+_message_row = itemgetter(slice(0, MESSAGE_COLUMN_COUNT))
+
+# Multi-row INSERT statements: prefix + one placeholder group per row
+MESSAGE_INSERT_SQL = """
+    INSERT INTO messages 
+    (icao24, timestamp, lat, lon, altitude, ground_speed, track, vertical_rate,
+     message_type, callsign, squawk, alert, emergency, spi, is_on_ground)
+    VALUES """
+MESSAGE_ROW_SQL = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+
+AIRCRAFT_INSERT_SQL = """
+    INSERT INTO aircraft (icao24, callsign, first_seen, last_seen)
+    VALUES """
+AIRCRAFT_ROW_SQL = "(%s, %s, %s, %s)"
+AIRCRAFT_UPSERT_SQL = """
+    ON DUPLICATE KEY UPDATE
+        callsign = COALESCE(VALUES(callsign), callsign),
+        last_seen = VALUES(last_seen)
+"""
+
+POSITION_INSERT_SQL = """
+    INSERT INTO positions (icao24, timestamp, lat, lon, altitude, ground_speed, track, vertical_rate)
+    VALUES """
+POSITION_ROW_SQL = "(%s, %s, %s, %s, %s, %s, %s, %s)"
+
 
 class DatabaseManager:
     """Manages MySQL database connections and operations"""
@@ -25,11 +57,18 @@ class DatabaseManager:
         """
         self.config = config
         self.pool = None
+        
+        # Long-lived connection for batch writes, checked out of the pool on
+        # first use. Only the processor's writer thread touches it.
+        self._writer_conn = None
+        
         self._init_connection_pool()
     
     def _init_connection_pool(self):
         """Initialize MySQL connection pool"""
         try:
+            # use_pure is left at its default: the C extension is used when
+            # installed, and forcing it raises ImportError on hosts without it
             self.pool = pooling.MySQLConnectionPool(
                 pool_name=self.config.get('pool_name', 'adsb_pool'),
                 pool_size=self.config.get('pool_size', 5),
@@ -82,12 +121,17 @@ class DatabaseManager:
             if conn:
                 conn.close()
     
-    def batch_insert_messages(self, messages: List[Dict[str, Any]]) -> int:
+    def batch_insert_messages(self, messages: List[Tuple]) -> int:
         """
         Batch insert parsed ADS-B messages
         
+        If the writer connection turns out to be lost, the batch is retried
+        once on a fresh connection. A connection lost after the server had
+        already committed therefore writes the batch twice (messages has no
+        unique key): delivery is at-least-once.
+        
         Args:
-            messages: List of parsed message dictionaries
+            messages: List of parsed ADSBMessage records
             
         Returns:
             Number of messages inserted
@@ -95,108 +139,126 @@ class DatabaseManager:
         if not messages:
             return 0
         
+        conn = self._get_writer_connection()
+        try:
+            return self._insert_batch(conn, messages)
+        except Exception as e:
+            if conn.is_connected():
+                logger.error("Batch insert failed: %s", e)
+                raise
+        
+        # The connection went away (idle past wait_timeout, server restart):
+        # return it to the pool, which reconnects on checkout, and retry once
+        logger.warning("Writer connection lost, retrying batch on a new connection")
+        self._release_writer_connection()
+        try:
+            return self._insert_batch(self._get_writer_connection(), messages)
+        except Exception as e:
+            logger.error("Batch insert failed: %s", e)
+            if self._writer_conn is not None and not self._writer_conn.is_connected():
+                self._release_writer_connection()
+            raise
+    
+    def _insert_batch(self, conn, messages: List[Tuple]) -> int:
+        """Insert one batch in a single transaction on conn; rolls back on error"""
         inserted = 0
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
+        cursor = conn.cursor()
+        
+        try:
+            # FIRST: Insert/update aircraft to satisfy foreign key constraints
+            self._upsert_aircraft(cursor, messages)
+            
+            # SECOND: Insert into messages table. Records carry trailing
+            # non-column fields (transmission_type), so bind only the
+            # leading column slice of each.
+            self._execute_multi_row(
+                cursor, MESSAGE_INSERT_SQL, MESSAGE_ROW_SQL,
+                list(map(_message_row, messages))
+            )
+            inserted = cursor.rowcount
+            
+            # THIRD: Insert position data
+            self._insert_positions(cursor, messages)
+            
+            conn.commit()
+            logger.debug("Inserted %d messages into database", inserted)
             
+        except Exception:
             try:
-                # FIRST: Insert/update aircraft to satisfy foreign key constraints
-                self._upsert_aircraft(cursor, messages)
-                
-                # SECOND: Insert into messages table
-                message_sql = """
-                    INSERT INTO messages 
-                    (icao24, message_type, timestamp, callsign, altitude, ground_speed, 
-                     track, lat, lon, vertical_rate, squawk, alert, emergency, spi, is_on_ground)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                
-                message_data = []
-                for msg in messages:
-                    message_data.append((
-                        msg.get('icao24'),
-                        msg.get('message_type'),
-                        msg.get('timestamp'),
-                        msg.get('callsign'),
-                        msg.get('altitude'),
-                        msg.get('ground_speed'),
-                        msg.get('track'),
-                        msg.get('lat'),
-                        msg.get('lon'),
-                        msg.get('vertical_rate'),
-                        msg.get('squawk'),
-                        msg.get('alert'),
-                        msg.get('emergency'),
-                        msg.get('spi'),
-                        msg.get('is_on_ground')
-                    ))
-                
-                cursor.executemany(message_sql, message_data)
-                inserted = cursor.rowcount
-                
-                # THIRD: Insert position data
-                self._insert_positions(cursor, messages)
-                
-                conn.commit()
-                logger.debug(f"Inserted {inserted} messages into database")
-                
-            except MySQLError as e:
                 conn.rollback()
-                logger.error(f"Batch insert failed: {e}")
-                raise
+            except MySQLError:
+                pass
+            raise
+        finally:
+            try:
+                cursor.close()
+            except MySQLError:
+                pass
         
         return inserted
     
-    def _upsert_aircraft(self, cursor, messages: List[Dict[str, Any]]):
-        """Update or insert aircraft information"""
-        aircraft_sql = """
-            INSERT INTO aircraft (icao24, callsign, first_seen, last_seen)
-            VALUES (%s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-                callsign = COALESCE(VALUES(callsign), callsign),
-                last_seen = VALUES(last_seen)
+    def _get_writer_connection(self):
+        """Return the writer connection, checking one out of the pool if needed"""
+        if self._writer_conn is None:
+            self._writer_conn = self.pool.get_connection()
+        return self._writer_conn
+    
+    def _release_writer_connection(self):
+        """Return the writer connection to the pool"""
+        if self._writer_conn is not None:
+            try:
+                self._writer_conn.close()
+            except MySQLError as e:
+                logger.debug("Error releasing writer connection: %s", e)
+            self._writer_conn = None
+    
+    def close(self):
+        """Release the long-lived writer connection"""
+        self._release_writer_connection()
+    
+    def _execute_multi_row(self, cursor, insert_sql: str, row_sql: str,
+                           rows: List[Tuple], suffix: str = ""):
         """
+        Execute rows as one INSERT ... VALUES (...), (...) statement
         
+        Args:
+            cursor: Open cursor
+            insert_sql: Statement up to and including VALUES
+            row_sql: Placeholder group for a single row
+            rows: Row tuples matching row_sql
+            suffix: Optional trailing clause (e.g. ON DUPLICATE KEY UPDATE)
+        """
+        sql = insert_sql + ", ".join([row_sql] * len(rows)) + suffix
+        cursor.execute(sql, list(chain.from_iterable(rows)))
+    
+    def _upsert_aircraft(self, cursor, messages: List[Tuple]):
+        """Update or insert aircraft information"""
         aircraft_data = []
         seen_icao = set()
         
         for msg in messages:
-            icao = msg.get('icao24')
+            icao = msg.icao24
             if icao and icao not in seen_icao:
                 seen_icao.add(icao)
-                aircraft_data.append((
-                    icao,
-                    msg.get('callsign'),
-                    msg.get('timestamp'),
-                    msg.get('timestamp')
-                ))
+                aircraft_data.append((icao, msg.callsign, msg.timestamp, msg.timestamp))
         
         if aircraft_data:
-            cursor.executemany(aircraft_sql, aircraft_data)
+            self._execute_multi_row(
+                cursor, AIRCRAFT_INSERT_SQL, AIRCRAFT_ROW_SQL, aircraft_data,
+                AIRCRAFT_UPSERT_SQL
+            )
     
-    def _insert_positions(self, cursor, messages: List[Dict[str, Any]]):
+    def _insert_positions(self, cursor, messages: List[Tuple]):
         """Insert position data for messages with location"""
-        position_sql = """
-            INSERT INTO positions (icao24, timestamp, lat, lon, altitude, ground_speed, track, vertical_rate)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        position_data = []
-        for msg in messages:
-            if msg.get('lat') is not None and msg.get('lon') is not None:
-                position_data.append((
-                    msg.get('icao24'),
-                    msg.get('timestamp'),
-                    msg.get('lat'),
-                    msg.get('lon'),
-                    msg.get('altitude'),
-                    msg.get('ground_speed'),
-                    msg.get('track'),
-                    msg.get('vertical_rate')
-                ))
+        position_data = [
+            m[:POSITION_COLUMN_COUNT]
+            for m in messages if m.lat is not None and m.lon is not None
+        ]
         
         if position_data:
-            cursor.executemany(position_sql, position_data)
+            self._execute_multi_row(
+                cursor, POSITION_INSERT_SQL, POSITION_ROW_SQL, position_data
+            )
     
     def get_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
@@ -4,18 +4,29 @@ Handles TCP connection to Dump1090 and reads BaseStation format data
 """
 
 import socket
+import struct
 import logging
-import time
-from typing import Optional, Callable
+import threading
+from typing import List, Optional, Callable
 
 logger = logging.getLogger(__name__)
 
+# Size of the persistent receive buffer; also the longest line accepted
+RECV_SIZE = 65536
+
+# Socket connect and read timeout in seconds
+SOCKET_TIMEOUT = 10
+
+# Default kernel receive buffer (SO_RCVBUF) in bytes; 0 leaves it to the
+# kernel, whose TCP autotuning an explicit SO_RCVBUF turns off
+DEFAULT_RCVBUF = 0
+
 
 class Dump1090Client:
     """Client for connecting to Dump1090 BaseStation output"""
     
     def __init__(self, host: str, port: int, reconnect_interval: int = 5, 
-                 max_reconnect_interval: int = 60):
+                 max_reconnect_interval: int = 60, rcvbuf: int = DEFAULT_RCVBUF):
         """
         Initialize Dump1090 client
         
@@ -24,14 +35,25 @@ class Dump1090Client:
             port: Dump1090 port (typically 30003 for BaseStation format)
             reconnect_interval: Initial reconnection interval in seconds
             max_reconnect_interval: Maximum reconnection interval
+            rcvbuf: Fixed socket receive buffer size in bytes (default 0
+                    keeps the kernel's autotuned buffer)
         """
         self.host = host
         self.port = port
         self.reconnect_interval = reconnect_interval
         self.max_reconnect_interval = max_reconnect_interval
+        self.rcvbuf = rcvbuf
         self.socket: Optional[socket.socket] = None
         self.connected = False
-        self.buffer = ""
+        
+        # Receive buffer reused across reads; _rxlen bytes of it hold the
+        # partial line left over from the previous read
+        self._rxbuf = bytearray(RECV_SIZE)
+        self._rxview = memoryview(self._rxbuf)
+        self._rxlen = 0
+        
+        # Set by interrupt(); ends reconnect waits early
+        self._interrupted = threading.Event()
         
     def connect(self) -> bool:
         """
@@ -42,8 +64,11 @@ class Dump1090Client:
         """
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(10)
+            self._set_receive_buffer()
+            self.socket.settimeout(SOCKET_TIMEOUT)
             self.socket.connect((self.host, self.port))
+            self._set_read_timeout()
+            self._rxlen = 0  # Drop any partial line from the old stream
             self.connected = True
             logger.info(f"Connected to Dump1090 at {self.host}:{self.port}")
             return True
@@ -52,6 +77,47 @@ class Dump1090Client:
             self.connected = False
             return False
     
+    def _set_receive_buffer(self):
+        """
+        Fix the kernel receive buffer (SO_RCVBUF) when rcvbuf is set
+        
+        Set before connect() so the TCP window scale is negotiated for
+        it. On Linux this disables receive autotuning and the kernel caps
+        the request at net.core.rmem_max, so it only helps when that
+        limit has been raised; a capped value is logged.
+        """
+        if not self.rcvbuf:
+            return
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+            actual = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        except OSError as e:
+            logger.warning("Could not set SO_RCVBUF: %s", e)
+            return
+        # Linux reports double the requested size (bookkeeping overhead)
+        if actual < self.rcvbuf:
+            logger.warning("SO_RCVBUF capped at %d bytes (requested %d); "
+                           "raise net.core.rmem_max or set rcvbuf to 0",
+                           actual, self.rcvbuf)
+    
+    def _set_read_timeout(self):
+        """
+        Move the read timeout into the kernel (SO_RCVTIMEO)
+        
+        With a Python-level timeout every recv() is preceded by a poll()
+        syscall; a blocking socket with SO_RCVTIMEO does one recv() per
+        read and reports an idle timeout as EAGAIN instead.
+        """
+        try:
+            self.socket.settimeout(None)
+            self.socket.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVTIMEO,
+                struct.pack('ll', SOCKET_TIMEOUT, 0)  # struct timeval
+            )
+        except (OSError, struct.error) as e:
+            logger.debug(f"SO_RCVTIMEO unavailable, using socket timeout: {e}")
+            self.socket.settimeout(SOCKET_TIMEOUT)
+    
     def disconnect(self):
         """Close connection to Dump1090"""
         if self.socket:
@@ -63,23 +129,41 @@ class Dump1090Client:
         self.connected = False
         logger.info("Disconnected from Dump1090")
     
-    def read_messages(self, callback: Callable[[str], None], running_flag: Callable[[], bool]):
+    def interrupt(self):
+        """
+        Wake read_messages() out of a blocking read or reconnect wait
+        
+        Safe to call from a signal handler. After EINTR Python retries a
+        blocking recv() (PEP 475), so shutting down the read side is what
+        makes it return right away instead of at the next SO_RCVTIMEO.
+        """
+        self._interrupted.set()
+        sock = self.socket
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+    
+    def read_messages(self, callback: Callable[[List[bytes]], None],
+                      stop_flag: Callable[[], bool]):
         """
-        Read messages from Dump1090 and call callback for each line
+        Read messages from Dump1090 and call callback with the lines of each read
         
         Args:
-            callback: Function to call with each complete message line
-            running_flag: Function that returns True while service should run
+            callback: Function to call with the list of complete message lines
+                      (bytes) received by one socket read
+            stop_flag: Function that returns True once the service should stop
         """
         current_reconnect_interval = self.reconnect_interval
         
-        while running_flag():
+        while not stop_flag():
             if not self.connected:
                 if self.connect():
                     current_reconnect_interval = self.reconnect_interval
                 else:
                     logger.warning(f"Reconnecting in {current_reconnect_interval} seconds...")
-                    time.sleep(current_reconnect_interval)
+                    self._interrupted.wait(current_reconnect_interval)
                     current_reconnect_interval = min(
                         current_reconnect_interval * 2, 
                         self.max_reconnect_interval
@@ -87,34 +171,52 @@ class Dump1090Client:
                     continue
             
             try:
-                # Read data from socket
-                data = self.socket.recv(4096)
-                if not data:
-                    logger.warning("Connection closed by Dump1090")
+                rxbuf = self._rxbuf
+                rxlen = self._rxlen
+                if rxlen == RECV_SIZE:
+                    logger.warning("Discarding %d bytes without a line break", rxlen)
+                    rxlen = 0
+                
+                # Read straight into the free tail of the receive buffer
+                received = self.socket.recv_into(self._rxview[rxlen:])
+                if not received:
+                    if not self._interrupted.is_set():
+                        logger.warning("Connection closed by Dump1090")
                     self.disconnect()
                     continue
+                end = rxlen + received
+                
+                # Cut off everything up to the last newline in one go and
+                # let bytes.splitlines() tokenize it; lines are handed on
+                # undecoded
+                nl = rxbuf.rfind(b'\n', 0, end)
+                if nl == -1:
+                    self._rxlen = end
+                    continue
+                chunk = bytes(self._rxview[:nl])
                 
-                # Decode and add to buffer
-                self.buffer += data.decode('utf-8', errors='ignore')
+                # Move the trailing partial line to the front
+                tail = end - nl - 1
+                if tail:
+                    rxbuf[:tail] = rxbuf[nl + 1:end]
+                self._rxlen = tail
                 
-                # Process complete lines
-                while '\n' in self.buffer:
-                    line, self.buffer = self.buffer.split('\n', 1)
-                    line = line.strip()
-                    if line:
-                        try:
-                            callback(line)
-                        except Exception as e:
-                            logger.error(f"Error processing message: {e}")
+                # Hand all complete lines from this read over in one call
+                lines = [line for line in map(bytes.strip, chunk.splitlines()) if line]
+                if lines:
+                    try:
+                        callback(lines)
+                    except Exception as e:
+                        logger.error("Error processing messages: %s", e)
                 
-            except socket.timeout:
-                # Timeout is normal, continue
+            except (socket.timeout, BlockingIOError):
+                # Timeout is normal (EAGAIN from SO_RCVTIMEO), continue
                 continue
             except socket.error as e:
-                logger.error(f"Socket error: {e}")
+                logger.error("Socket error: %s", e)
                 self.disconnect()
             except Exception as e:
-                logger.error(f"Unexpected error reading messages: {e}")
+                logger.error("Unexpected error reading messages: %s", e)
                 self.disconnect()
         
         self.disconnect()
@@ -7,10 +7,13 @@ import sys
 import os
 import signal
 import logging
-import time
+import queue
 import threading
-from logging.handlers import RotatingFileHandler
+import time
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
+from typing import List
 
 from config_manager import ConfigManager
 from database_manager import DatabaseManager
@@ -18,13 +21,61 @@ from dump1090_client import Dump1090Client
 from adsb_parser import ADSBParser
 from data_processor import DataProcessor
 
-# Service state
-running = True
+# Service instance, for the signal handler
 service = None
 
+# Seconds to wait for the background thread on shutdown
+THREAD_JOIN_TIMEOUT = 10
+
+# Seconds between statistics log entries
+STATS_INTERVAL = 60
+
+
+class FastFormatter(logging.Formatter):
+    """
+    Formatter that reuses the formatted timestamp within each second
+    
+    Only valid for date formats without sub-second fields; the
+    strftime() call then runs once per second instead of once per record.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._time_cache = (None, '')  # (epoch second, formatted time)
+    
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        cached_second, formatted = self._time_cache
+        if second != cached_second:
+            formatted = super().formatTime(record, datefmt)
+            self._time_cache = (second, formatted)
+        return formatted
+
+
+class LocalQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues records as-is
+    
+    The stock prepare() formats the message (and any traceback) and copies
+    the record on the logging thread so it can be pickled; the queue is
+    in-process, so that work is left to the QueueListener thread instead.
+    """
+    
+    def prepare(self, record):
+        return record
+
 
-def setup_logging(log_config: dict):
-    """Setup logging configuration"""
+def setup_logging(log_config: dict) -> QueueListener:
+    """
+    Setup logging configuration
+    
+    Loggers only enqueue records; formatting and console/file writes
+    happen on a QueueListener thread so rotation or slow disks never
+    stall the ingest threads.
+    
+    Returns:
+        The started QueueListener; stop it on exit to flush pending records
+    """
     log_level = getattr(logging, log_config.get('level', 'INFO').upper())
     log_file = log_config.get('file', '/var/log/adsb-ingestion/service.log')
     max_bytes = log_config.get('max_bytes', 10485760)  # 10MB
@@ -38,17 +89,20 @@ def setup_logging(log_config: dict):
     logger = logging.getLogger()
     logger.setLevel(log_level)
     
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(log_level)
-    console_formatter = logging.Formatter(
+    # Shared by both handlers, so each second is formatted once
+    formatter = FastFormatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    
+    # Console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(log_level)
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler]
     
     # File handler with rotation
+    file_error = None
     try:
         file_handler = RotatingFileHandler(
             log_file,
@@ -56,100 +110,155 @@ def setup_logging(log_config: dict):
             backupCount=backup_count
         )
         file_handler.setLevel(log_level)
-        file_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
     except Exception as e:
-        logger.warning(f"Could not setup file logging: {e}")
+        file_error = e
+    
+    # Route all records through a queue to the listener thread
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(LocalQueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    
+    if file_error:
+        logger.warning(f"Could not setup file logging: {file_error}")
+    
+    return listener
 
 
 def signal_handler(signum, frame):
     """Handle shutdown signals"""
-    global running
     logger = logging.getLogger(__name__)
     logger.info(f"Received signal {signum}, shutting down gracefully...")
-    running = False
+    if service is None:
+        # Still initializing; nothing has been read or queued yet
+        raise SystemExit(0)
+    service.stop()
 
 
-def is_running():
-    """Check if service should continue running"""
-    return running
+class _AuxLoop(threading.Thread):
+    """
+    Background thread running the database writer and the statistics timer
+    
+    Both are idle nearly all the time, so they share one thread: the
+    writer's queue wait is capped at the next statistics deadline.
+    """
+    
+    def __init__(self, service: 'ADSBIngestionService'):
+        super().__init__(name='aux', daemon=True)
+        self.service = service
+    
+    def run(self):
+        service = self.service
+        stopped = service._shutdown_event.is_set
+        periodic_flush_once = service.processor.periodic_flush_once
+        next_stats = time.monotonic() + STATS_INTERVAL
+        
+        while not stopped():
+            periodic_flush_once(next_stats - time.monotonic())
+            
+            if time.monotonic() >= next_stats and not stopped():
+                next_stats += STATS_INTERVAL
+                try:
+                    service.print_stats()
+                except Exception as e:
+                    service.logger.error(f"Failed to print statistics: {e}")
 
 
 class ADSBIngestionService:
     """Main service class"""
     
-    def __init__(self, config_path: str = None):
-        """Initialize the service"""
+    def __init__(self, config_path: str = None, config: ConfigManager = None):
+        """
+        Initialize the service
+        
+        Args:
+            config_path: Path to YAML configuration file
+            config: Already loaded configuration; takes precedence over config_path
+        """
         self.logger = logging.getLogger(__name__)
         
-        # Load configuration
-        self.config = ConfigManager(config_path)
+        # Load configuration unless the caller already has
+        self.config = config if config is not None else ConfigManager(config_path)
         
-        # Initialize components
-        self.db = DatabaseManager(self.config.get_database_config())
+        # Initialize components; the database pool setup and the Dump1090
+        # connect are both network-bound, so they run concurrently. A failed
+        # connect is retried by read_messages().
         self.client = Dump1090Client(
             **self.config.get_dump1090_config()
         )
-        self.parser = ADSBParser()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            db_future = executor.submit(DatabaseManager, self.config.get_database_config())
+            executor.submit(self.client.connect)
+            self.parser = ADSBParser()
+            try:
+                self.db = db_future.result()
+            except Exception:
+                executor.shutdown(wait=True)
+                self.client.disconnect()
+                raise
         self.processor = DataProcessor(
             self.db,
             self.config.get_processing_config()
         )
         
-        # Statistics thread
-        self.stats_thread = None
+        # Set on shutdown; every loop polls its is_set()
+        self._shutdown_event = threading.Event()
         
-    def message_callback(self, line: str):
-        """Handle incoming message line"""
-        parsed = self.parser.parse(line)
+        # Background thread (database writer and statistics)
+        self.aux_thread = None
+        self._db_stats_thread = None
+        
+    def message_callback(self, lines: List[bytes]):
+        """Handle the batch of message lines from one socket read"""
+        parsed = self.parser.parse_batch(lines)
         if parsed:
-            self.processor.add_message(parsed)
+            self.processor.add_messages(parsed)
     
     def print_stats(self):
-        """Periodically print statistics"""
-        while is_running():
-            time.sleep(60)  # Print every minute
-            
-            proc_stats = self.processor.get_stats()
-            db_stats = self.db.get_stats()
-            
-            self.logger.info("=== Service Statistics ===")
-            self.logger.info(f"Messages Received: {proc_stats['messages_received']}")
-            self.logger.info(f"Messages Processed: {proc_stats['messages_processed']}")
-            self.logger.info(f"Messages Discarded: {proc_stats['messages_discarded']}")
-            self.logger.info(f"Batches Written: {proc_stats['batches_written']}")
-            self.logger.info(f"Queue Size: {proc_stats['queue_size']}")
-            self.logger.info(f"Errors: {proc_stats['errors']}")
-            self.logger.info(f"Total Aircraft: {db_stats.get('total_aircraft', 0)}")
-            self.logger.info(f"Total Messages: {db_stats.get('total_messages', 0)}")
-            self.logger.info(f"Messages Last Hour: {db_stats.get('messages_last_hour', 0)}")
+        """Print statistics (every STATS_INTERVAL seconds, from the aux thread)"""
+        proc_stats = self.processor.get_stats()
+        
+        self.logger.info("=== Service Statistics ===")
+        self.logger.info(f"Messages Received: {proc_stats['messages_received']}")
+        self.logger.info(f"Messages Processed: {proc_stats['messages_processed']}")
+        self.logger.info(f"Messages Discarded: {proc_stats['messages_discarded']}")
+        self.logger.info(f"Batches Written: {proc_stats['batches_written']}")
+        self.logger.info(f"Queue Size: {proc_stats['queue_size']}")
+        self.logger.info(f"Batch Size: {proc_stats['batch_size']}")
+        self.logger.info(f"Errors: {proc_stats['errors']}")
+        
+        # The database totals are COUNT(*) scans that can take a while on
+        # large tables; run them off the aux thread so flushing never stalls
+        if self._db_stats_thread is None or not self._db_stats_thread.is_alive():
+            self._db_stats_thread = threading.Thread(
+                target=self._print_db_stats,
+                name='db-stats',
+                daemon=True
+            )
+            self._db_stats_thread.start()
+    
+    def _print_db_stats(self):
+        """Print database totals (on a short-lived thread, see print_stats)"""
+        db_stats = self.db.get_stats()
+        self.logger.info(f"Total Aircraft: {db_stats.get('total_aircraft', 0)}")
+        self.logger.info(f"Total Messages: {db_stats.get('total_messages', 0)}")
+        self.logger.info(f"Messages Last Hour: {db_stats.get('messages_last_hour', 0)}")
     
     def run(self):
         """Run the service"""
         self.logger.info("Starting ADS-B Ingestion Service")
         
-        # Start periodic flush thread
-        flush_thread = threading.Thread(
-            target=self.processor.periodic_flush,
-            args=(is_running,),
-            daemon=True
-        )
-        flush_thread.start()
+        # Start the writer/statistics thread
+        self.aux_thread = _AuxLoop(self)
+        self.aux_thread.start()
         
-        # Start statistics thread
-        self.stats_thread = threading.Thread(
-            target=self.print_stats,
-            daemon=True
-        )
-        self.stats_thread.start()
-        
-        # Main message reading loop
+        # Main message reading loop; the aux thread is running, so anything
+        # from here on must end in shutdown()
         try:
-            self.client.read_messages(self.message_callback, is_running)
+            self._apply_cpu_affinity()
+            self.client.read_messages(self.message_callback, self._shutdown_event.is_set)
         except KeyboardInterrupt:
             self.logger.info("Keyboard interrupt received")
         except Exception as e:
@@ -157,12 +266,53 @@ class ADSBIngestionService:
         finally:
             self.shutdown()
     
+    def _apply_cpu_affinity(self):
+        """Pin the reader and aux threads to their configured CPUs"""
+        affinity = self.config.get('processing', 'cpu_affinity')
+        if not affinity:
+            return
+        if not isinstance(affinity, dict):
+            self.logger.warning("cpu_affinity must map thread names to CPU lists, "
+                                "e.g. {reader: [1], aux: [2]}; ignoring %r", affinity)
+            return
+        if not hasattr(os, 'sched_setaffinity'):
+            self.logger.warning("cpu_affinity is not supported on this platform")
+            return
+        
+        # Thread id 0 is the calling (main, reader) thread
+        thread_ids = {
+            'reader': 0,
+            'aux': self.aux_thread.native_id
+        }
+        for name, cpus in affinity.items():
+            if name not in thread_ids:
+                self.logger.warning("Unknown cpu_affinity thread: %s", name)
+                continue
+            try:
+                os.sched_setaffinity(thread_ids[name], set(cpus))
+                self.logger.info("Pinned %s thread to CPUs %s", name, sorted(cpus))
+            except (OSError, TypeError, ValueError) as e:
+                self.logger.warning("Could not pin %s thread: %s", name, e)
+    
+    def stop(self):
+        """Request shutdown; wakes the reader and background threads"""
+        self._shutdown_event.set()
+        self.client.interrupt()
+    
     def shutdown(self):
         """Cleanup and shutdown"""
         self.logger.info("Shutting down service...")
         
+        # Stop the background thread; it finishes its current batch and
+        # wakes from its queue wait right away
+        self._shutdown_event.set()
+        self.processor.wake()
+        if self.aux_thread is not None:
+            self.aux_thread.join(timeout=THREAD_JOIN_TIMEOUT)
+        
         # Flush remaining messages
         self.processor.force_flush()
+        self.db.close()
         
         # Disconnect client
         self.client.disconnect()
@@ -180,7 +330,6 @@ def main():
     global service
     
     # Parse command line arguments
-    config_path = None
     if len(sys.argv) > 1:
         config_path = sys.argv[1]
     else:
@@ -190,15 +339,12 @@ def main():
             './config/config.yaml',
             './config.yaml'
         ]
-        for path in default_paths:
-            if os.path.exists(path):
-                config_path = path
-                break
+        config_path = next((path for path in default_paths if os.path.exists(path)), None)
     
-    # Load config for logging setup
+    # Load config once, for logging setup and the service
     try:
         config = ConfigManager(config_path)
-        setup_logging(config.get_logging_config())
+        log_listener = setup_logging(config.get_logging_config())
     except Exception as e:
         print(f"Failed to load configuration: {e}")
         sys.exit(1)
@@ -214,11 +360,14 @@ def main():
     
     # Create and run service
     try:
-        service = ADSBIngestionService(config_path)
+        service = ADSBIngestionService(config=config)
         service.run()
     except Exception as e:
         logger.error(f"Fatal error: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        # Last step so shutdown()'s final log lines are still written
+        log_listener.stop()
     
     sys.exit(0)
 
@@ -0,0 +1,60 @@
+"""
+Tests for DataProcessor deduplication
+Run from the repository root: python -m unittest discover tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from adsb_parser import ADSBParser  # noqa: E402
+from data_processor import DataProcessor  # noqa: E402
+
+GOOD_LINE = (b'MSG,3,1,1,4CA2D6,1,2024/01/01,12:34:56.789,2024/01/01,12:34:56.789,'
+             b',35000,,,51.5,-0.1,,,0,0,0,0')
+NO_TIME_LINE = b'MSG,3,1,1,4CA2D6,1,,,,,,36000,,,52.5,-0.2,,,0,0,0,0'
+NO_TIME_LINE_2 = b'MSG,3,1,1,4CA2D6,1,,,,,,36100,,,52.6,-0.3,,,0,0,0,0'
+
+
+def queued(processor):
+    """Messages currently on the processor's queue"""
+    processor._drain_queue()
+    return processor.pending
+
+
+class DeduplicationTest(unittest.TestCase):
+    """add_messages() deduplication of parsed records"""
+
+    def setUp(self):
+        self.parser = ADSBParser()
+        self.processor = DataProcessor(None, {'batch_size': 100})
+
+    def test_exact_duplicate_discarded(self):
+        self.processor.add_messages(self.parser.parse_batch([GOOD_LINE, GOOD_LINE]))
+
+        self.assertEqual(len(queued(self.processor)), 1)
+        self.assertEqual(self.processor.get_stats()['messages_discarded'], 1)
+
+    def test_fallback_timestamps_in_one_read_not_deduplicated(self):
+        messages = self.parser.parse_batch([NO_TIME_LINE, NO_TIME_LINE_2])
+        self.assertEqual(len(messages), 2)
+        self.assertTrue(all(m.timestamp_estimated for m in messages))
+        self.assertEqual(messages[0].timestamp, messages[1].timestamp)
+
+        self.processor.add_messages(messages)
+
+        self.assertEqual([m.altitude for m in queued(self.processor)], [36000, 36100])
+        self.assertEqual(self.processor.get_stats()['messages_discarded'], 0)
+
+    def test_fallback_timestamp_after_good_line(self):
+        self.processor.add_messages(self.parser.parse_batch([GOOD_LINE]))
+        self.processor.add_messages(self.parser.parse_batch([NO_TIME_LINE]))
+
+        self.assertEqual(len(queued(self.processor)), 2)
+        self.assertEqual(self.processor.get_stats()['messages_discarded'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+"""
+Tests for DatabaseManager batch inserts
+Run from the repository root: python -m unittest discover tests
+"""
+
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from adsb_parser import ADSBMessage  # noqa: E402
+from database_manager import DatabaseManager  # noqa: E402
+
+
+def make_manager():
+    """DatabaseManager with a mocked pool and writer connection"""
+    with mock.patch.object(DatabaseManager, '_init_connection_pool'):
+        db = DatabaseManager({'database': 'adsb'})
+    db.pool = mock.MagicMock()
+    conn = db.pool.get_connection.return_value
+    cursor = conn.cursor.return_value
+    cursor.rowcount = 2
+    return db, conn, cursor
+
+
+class BatchInsertMessagesTest(unittest.TestCase):
+    """batch_insert_messages() writes one multi-row INSERT per table"""
+
+    def setUp(self):
+        timestamp = datetime(2024, 1, 1, 12, 34, 56, 789000)
+        self.messages = [
+            ADSBMessage('4CA2D6', timestamp, 51.5, -0.1, 35000, 450.5, 90.1, -64,
+                        'MSG', 'RYR123', '7000', False, False, False, False, 3),
+            ADSBMessage('400F01', timestamp, 52.0, 0.2, 12000, None, None, None,
+                        'MSG', None, None, None, None, None, False, 3),
+        ]
+
+    def executed(self, cursor):
+        """Map table name -> (sql, params) of each execute() call"""
+        calls = {}
+        for call in cursor.execute.call_args_list:
+            sql, params = call[0]
+            table = sql.split('INTO', 1)[1].split()[0]
+            self.assertNotIn(table, calls, f"more than one execute() for {table}")
+            calls[table] = (sql, params)
+        return calls
+
+    def test_single_execute_per_table(self):
+        db, conn, cursor = make_manager()
+
+        self.assertEqual(db.batch_insert_messages(self.messages), 2)
+
+        cursor.executemany.assert_not_called()
+        self.assertEqual(cursor.execute.call_count, 3)
+        self.assertEqual(set(self.executed(cursor)), {'aircraft', 'messages', 'positions'})
+        conn.commit.assert_called_once()
+
+    def test_placeholders_match_parameters(self):
+        db, _, cursor = make_manager()
+
+        db.batch_insert_messages(self.messages)
+
+        for table, (sql, params) in self.executed(cursor).items():
+            with self.subTest(table=table):
+                self.assertEqual(sql.count('%s'), len(params))
+
+    def test_row_values_in_column_order(self):
+        db, _, cursor = make_manager()
+
+        db.batch_insert_messages(self.messages)
+        calls = self.executed(cursor)
+
+        _, params = calls['messages']
+        self.assertEqual(len(params), 2 * 15)
+        self.assertEqual(tuple(params[:15]), tuple(self.messages[0][:15]))
+
+        _, params = calls['positions']
+        self.assertEqual(len(params), 2 * 8)
+        self.assertEqual(tuple(params[8:]), tuple(self.messages[1][:8]))
+
+        _, params = calls['aircraft']
+        self.assertEqual(params[:4], ['4CA2D6', 'RYR123', self.messages[0].timestamp,
+                                      self.messages[0].timestamp])
+
+    def test_duplicate_aircraft_collapsed(self):
+        db, _, cursor = make_manager()
+
+        db.batch_insert_messages(self.messages + self.messages[:1])
+
+        sql, params = self.executed(cursor)['aircraft']
+        self.assertEqual(len(params), 2 * 4)
+        self.assertEqual(sql.count('%s'), len(params))
+
+    def test_rollback_on_error(self):
+        db, conn, cursor = make_manager()
+        cursor.execute.side_effect = RuntimeError('boom')
+        conn.is_connected.return_value = True
+
+        with self.assertRaises(RuntimeError):
+            db.batch_insert_messages(self.messages)
+
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
+
+
+class WriterConnectionRetryTest(unittest.TestCase):
+    """batch_insert_messages() retry when the writer connection is lost"""
+
+    def setUp(self):
+        self.messages = [ADSBMessage('4CA2D6', datetime(2024, 1, 1, 12, 34, 56),
+                                     51.5, -0.1, 35000)]
+
+    def make_connection(self, fails: bool, connected: bool):
+        """Mock connection whose statements fail or succeed"""
+        conn = mock.MagicMock()
+        cursor = conn.cursor.return_value
+        cursor.rowcount = 1
+        if fails:
+            cursor.execute.side_effect = RuntimeError('Lost connection to MySQL server')
+        conn.is_connected.return_value = connected
+        return conn
+
+    def make_manager(self, *connections):
+        with mock.patch.object(DatabaseManager, '_init_connection_pool'):
+            db = DatabaseManager({'database': 'adsb'})
+        db.pool = mock.MagicMock()
+        db.pool.get_connection.side_effect = list(connections)
+        return db
+
+    def test_dead_connection_released_and_retried_once(self):
+        dead = self.make_connection(fails=True, connected=False)
+        fresh = self.make_connection(fails=False, connected=True)
+        db = self.make_manager(dead, fresh)
+
+        self.assertEqual(db.batch_insert_messages(self.messages), 1)
+
+        self.assertEqual(db.pool.get_connection.call_count, 2)
+        dead.close.assert_called_once()
+        fresh.commit.assert_called_once()
+        fresh.close.assert_not_called()
+        self.assertIs(db._writer_conn, fresh)
+
+    def test_live_connection_failure_not_retried(self):
+        live = self.make_connection(fails=True, connected=True)
+        db = self.make_manager(live)
+
+        with self.assertRaises(RuntimeError):
+            db.batch_insert_messages(self.messages)
+
+        self.assertEqual(db.pool.get_connection.call_count, 1)
+        live.rollback.assert_called_once()
+        live.close.assert_not_called()
+        self.assertIs(db._writer_conn, live)
+
+    def test_second_failure_raises_and_releases(self):
+        dead = self.make_connection(fails=True, connected=False)
+        still_dead = self.make_connection(fails=True, connected=False)
+        db = self.make_manager(dead, still_dead)
+
+        with self.assertRaises(RuntimeError):
+            db.batch_insert_messages(self.messages)
+
+        self.assertEqual(db.pool.get_connection.call_count, 2)
+        dead.close.assert_called_once()
+        still_dead.close.assert_called_once()
+        self.assertIsNone(db._writer_conn)
+
+
+if __name__ == '__main__':
+    unittest.main()